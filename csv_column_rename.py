@@ -1,12 +1,17 @@
-import pandas as pd
 import argparse
+import csv
+import io
+import os
+import shutil
+import tempfile
 
 def main():
     """
     Main function to rename columns in a CSV file.
 
     This function uses argparse to handle command-line arguments for input file path and column names.
-    It reads a CSV file, renames specified columns, and saves the updated DataFrame back to the same CSV file.
+    Only the header line of the CSV file is parsed and rewritten; the remaining bytes are copied
+    unchanged into a temporary file which then atomically replaces the original CSV file.
 
     Command-line arguments:
     -i, --input: Input CSV file path (default: 'human_proteoform_glycosylation_sites_gptwiki.csv')
@@ -26,23 +31,48 @@ def main():
     parser.add_argument('-g', '--glycan', type=str, default='saccharide', help='Column name for glycan')
     args = parser.parse_args()
 
-    # Load the CSV file
-    df = pd.read_csv(args.input)
-
-    # Check if the columns have already been renamed
-    if all(col in df.columns for col in ['protein', 'glycosylation_site', 'glycan']):
-        print("Columns have already been renamed.")
-    else:
-        # Rename the columns
-        df.rename(columns={
-            args.protein: 'protein',
-            args.site: 'glycosylation_site',
-            args.glycan: 'glycan'
-        }, inplace=True)
-
-        # Save the updated DataFrame back to the same CSV file
-        df.to_csv(args.input, index=False)
-        print("Columns have been renamed and the updated CSV has been saved.")
+    renames = {
+        args.protein: 'protein',
+        args.site: 'glycosylation_site',
+        args.glycan: 'glycan'
+    }
+
+    with open(args.input, 'rb') as src:
+        # Only the header line is parsed; the body is never decoded.
+        header_line = src.readline()
+        header_text = header_line.decode('utf-8-sig')
+        if not header_text.strip():
+            print("Input CSV file is empty; no columns to rename.")
+            return
+        columns = next(csv.reader([header_text]))
+
+        # Check if the columns have already been renamed
+        if all(col in columns for col in ['protein', 'glycosylation_site', 'glycan']):
+            print("Columns have already been renamed.")
+            return
+
+        # Rename the columns, keeping the original line ending
+        line_ending = header_text[len(header_text.rstrip('\r\n')):] or '\n'
+        new_header = io.StringIO()
+        csv.writer(new_header, lineterminator=line_ending).writerow(
+            [renames.get(col, col) for col in columns])
+
+        # Write the new header and copy the remaining bytes unchanged to a temporary
+        # file next to the input, then atomically replace the original CSV file.
+        tmp_fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(args.input)),
+                                            suffix='.tmp')
+        try:
+            with os.fdopen(tmp_fd, 'wb') as dst:
+                dst.write(new_header.getvalue().encode('utf-8'))
+                shutil.copyfileobj(src, dst, length=1 << 20)
+            # mkstemp creates the file with mode 0600; keep the original CSV's mode.
+            shutil.copymode(args.input, tmp_path)
+            os.replace(tmp_path, args.input)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    print("Columns have been renamed and the updated CSV has been saved.")
 
 if __name__ == '__main__':
     main()
@@ -8,88 +8,238 @@ Glycopeptide Proteoform Generator
 Author: richarddshipman, Review with: Gemini 2.5 Pro and ChatGPT 4o
 """
 
+import csv
+import io
 import itertools
 from pathlib import Path
-from collections import defaultdict
 import pandas as pd
 import argparse
+import contextlib
 from datetime import datetime
 import logging
-from concurrent.futures import ProcessPoolExecutor, as_completed
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
 import time
 import traceback # Added for detailed error logging
+from typing import Iterator, Optional, Union
 
 # Set up logging configuration
 logging.basicConfig(level=logging.INFO, 
                     format='%(asctime)s - %(levelname)s - %(message)s')
 
-def generate_proteoforms_with_limit(protein_data: dict, limit: int = 100) -> list:
+# Number of input CSV rows parsed and aggregated at a time.
+READ_CHUNK_SIZE = 1_000_000
+
+# Buffer size in bytes for output files, so large outputs are flushed in few writes.
+WRITE_BUFFER_SIZE = 1 << 20
+
+# Below either threshold (total proteoforms to generate, or number of proteins),
+# proteins are processed serially, since starting a process pool would cost more.
+PARALLEL_MIN_PROTEOFORMS = 10_000
+PARALLEL_MIN_PROTEINS = 4
+
+# Upper bound on process pool workers on Windows, where WaitForMultipleObjects
+# limits ProcessPoolExecutor to 61 workers.
+WINDOWS_MAX_WORKERS = 61
+
+# (protein, glycopeptide data) pairs of all proteins, installed in each pool worker
+# by init_worker.
+_worker_protein_items = None
+
+def write_csv_rows(path: Path, header: list, rows: list) -> None:
+    """
+    Write a header and rows to a CSV file with the standard library csv writer.
+    
+    Args:
+        path (Path): Path of the CSV file to write.
+        header (list): Column names.
+        rows (list): Row tuples, one per line.
+    """
+    with path.open("w", buffering=WRITE_BUFFER_SIZE, newline="") as csv_file:
+        writer = csv.writer(csv_file, lineterminator="\n")
+        writer.writerow(header)
+        writer.writerows(rows)
+
+def read_glycans_by_site(input_file: str, protein_col: str, site_col: str, glycan_col: str) -> dict:
+    """
+    Read the input CSV file and collect the unique glycans of each (protein, site) group.
+    
+    Only the three used columns are read, in chunks of READ_CHUNK_SIZE rows, so peak
+    memory is bounded by the chunk size rather than the size of the input file.
+    
+    Args:
+        input_file (str): Path to the input CSV file.
+        protein_col (str): Name of the protein column in the CSV.
+        site_col (str): Name of the glycosylation site column.
+        glycan_col (str): Name of the glycan column.
+    
+    Returns:
+        dict: {(protein_id, glycosylation_site_id): {glycan1: None, glycan2: None, ...}, ...}
+              with glycans in order of first appearance.
+    """
+    glycans_by_site = {}
+    # Protein, site and glycan identifiers repeat heavily, so the categorical dtype
+    # stores each distinct value only once. Categorical site IDs are read as strings,
+    # which site_sort_key still orders numerically where possible.
+    reader = pd.read_csv(input_file,
+                         usecols=[protein_col, site_col, glycan_col],
+                         dtype={protein_col: "category", site_col: "category", glycan_col: "category"},
+                         chunksize=READ_CHUNK_SIZE)
+    with reader:
+        for chunk in reader:
+            # Group each chunk by protein and site in a single vectorized pass, and
+            # merge the unique glycans of each group into an insertion-ordered dict.
+            chunk_glycans = chunk.groupby([protein_col, site_col], sort=False,
+                                          dropna=False, observed=True)[glycan_col].unique()
+            for key, glycans in chunk_glycans.items():
+                glycans_by_site.setdefault(key, {}).update(dict.fromkeys(glycans))
+    return glycans_by_site
+
+def site_sort_key(site) -> tuple[int, Union[int, str]]:
+    """
+    Sort key for glycosylation site IDs, handling non-integer site IDs robustly.
+    
+    Args:
+        site: Glycosylation site identifier.
+    
+    Returns:
+        tuple: (0, int) for numerical sorting, or (1, str) for alphabetical sorting
+               if the site cannot be converted. The leading flag keeps keys of mixed
+               numeric and non-numeric sites comparable, numeric sites first.
+    """
+    try:
+        # Attempt to convert site to integer for numerical sorting.
+        return (0, int(site))
+    except (ValueError, TypeError):
+        # If conversion fails, convert to string for alphabetical sorting.
+        return (1, str(site))
+
+def count_proteoforms(protein_data: dict, limit: int) -> int:
+    """
+    Count the proteoforms of a protein combinatorially, without generating them.
+    
+    Args:
+        protein_data (dict): A dictionary where keys are glycosylation sites and values 
+                             are sequences of glyco options for that site.
+        limit (int): Maximum count of interest; counting stops once it is reached.
+    
+    Returns:
+        int: min(limit, product of the number of glyco options per site).
+    """
+    total = 1
+    for glyco_options in protein_data.values():
+        total *= len(glyco_options)
+        if total >= limit:
+            return limit
+    return total
+
+def generate_proteoforms_with_limit(protein_data: dict, limit: int = 100) -> Iterator[tuple]:
     """
     Generate unique proteoform combinations for a given protein using a more
     efficient, refactored approach.
     
     Args:
         protein_data (dict): A dictionary where keys are glycosylation sites and values 
-                             are lists containing one list of glyco options (tuples).
+                             are sequences of glyco options for that site, e.g.
+                             (site, glycan) tuples or pre-formatted "site-glycan" strings.
         limit (int): Maximum number of proteoforms to generate.
     
-    Returns:
-        list: A list of unique proteoform combinations.
+    Yields:
+        tuple: Unique proteoform combinations, lazily and in the deterministic order
+               produced by itertools.product.
     """
-    # The values of protein_data are lists like [[(site1, G1), (site1, G2)], ...].
-    # We extract the inner list of options for each site.
-    option_lists = [options[0] for options in protein_data.values()]
-    
+    # The values of protein_data are sequences of options, one per site; each
+    # proteoform takes exactly one option from every site.
     # Generate the Cartesian product of all glyco options across all sites.
-    proteoforms_iter = itertools.product(*option_lists)
+    proteoforms_iter = itertools.product(*protein_data.values())
     
-    # Use itertools.islice for a more direct and efficient way to enforce the limit.
-    # This avoids iterating manually with a counter.
-    limited_proteoforms = list(itertools.islice(proteoforms_iter, limit))
+    # The Cartesian product of unique per-site option lists is already unique,
+    # so no further de-duplication is needed.
+    # If the whole product fits within the limit, it is yielded as is.
+    if count_proteoforms(protein_data, limit + 1) <= limit:
+        yield from proteoforms_iter
+        return
     
-    # Using a set ensures uniqueness, which is good practice although itertools.product
-    # already produces unique tuples if the input option lists are unique.
-    return list(set(limited_proteoforms))
+    # Otherwise use itertools.islice to lazily take at most `limit` combinations
+    # without materializing the full product, or even the limited list of combinations.
+    yield from itertools.islice(proteoforms_iter, limit)
 
-def process_protein(protein: str, protein_data: dict, limit: int) -> tuple[str, int, list]:
+def process_protein(protein: str, protein_data: dict, limit: int) -> tuple[str, int, bytes]:
     """
     Process a single protein: generate proteoforms and prepare data for output.
     This function returns data for later aggregation, rather than writing to disk directly.
     
     Args:
         protein (str): Protein identifier.
-        protein_data (dict): Glycopeptide data for the protein.
+        protein_data (dict): Glycopeptide data for the protein, with sites already
+                             in output order (see site_sort_key).
         limit (int): Maximum number of proteoforms to generate.
     
     Returns:
-        tuple: (protein, number of proteoforms generated, list of formatted proteoform strings)
+        tuple: (protein, number of proteoforms generated, merged CSV rows as one UTF-8 block)
     """
-    proteoforms_raw = generate_proteoforms_with_limit(protein_data, limit)
-    formatted_proteoform_strings = []
+    # Each (site, glycan) pair appears in many proteoforms, so format it into the
+    # desired string format "site-glycan" once up front, keeping one list of
+    # formatted options per site in the same site order as protein_data.
+    formatted_options = {
+        glycosylation_site: [f"{site}-{glycan if glycan is not None else 'None'}"
+                             for site, glycan in glyco_options]
+        for glycosylation_site, glyco_options in protein_data.items()
+    }
+    proteoform_id_prefix = f"{protein}_PF_"
+    # Bound method hoisted out of the row loop to skip the attribute lookup per row.
+    join_pairs = ":".join
     
-    for idx, proteoform in enumerate(proteoforms_raw, 1):
-        # Flatten the proteoform tuple structure to a list of (site, glycan) pairs.
-        # A raw proteoform looks like: ((site1, glycanA), (site2, None))
-        current_protein_glyco_states = list(proteoform)
-        
-        # Sort glycosylation sites for consistent output format.
-        # The improved sort key handles non-integer site IDs more robustly.
-        def sort_key(x):
-            site = x[0]
-            try:
-                # Attempt to convert site to integer for numerical sorting.
-                return int(site)
-            except (ValueError, TypeError):
-                # If conversion fails, convert to string for alphabetical sorting.
-                return str(site)
-
-        current_protein_glyco_states.sort(key=sort_key)
-        
-        # Format the sorted sites into the desired string format "site-glycan".
-        formatted_sites = ":".join([f"{site}-{glycan if glycan is not None else 'None'}" for site, glycan in current_protein_glyco_states])
-        formatted_proteoform_strings.append(f"{protein}_PF_{idx},{formatted_sites}")
+    # Consume the proteoforms lazily and hand the rows straight to the C-level
+    # csv writer, which also quotes any field containing a comma (e.g. WURCS glycans).
+    # Enumerating the formatted options yields each proteoform as a tuple of
+    # "site-glycan" strings, already in sorted site order because itertools.product
+    # follows the order of the sites, so it only needs to be joined.
+    rows_buffer = io.StringIO()
+    csv.writer(rows_buffer, lineterminator="\n").writerows(
+        (protein, f"{proteoform_id_prefix}{idx}", join_pairs(formatted_pairs))
+        for idx, formatted_pairs in enumerate(generate_proteoforms_with_limit(formatted_options, limit), 1)
+    )
     
-    return protein, len(proteoforms_raw), formatted_proteoform_strings
+    # Encode the rows here, so a single bytes object crosses the process boundary
+    # and the parent writes it with a single write call.
+    merged_rows = rows_buffer.getvalue().encode("utf-8")
+    # The number of rows written is known combinatorially, without counting them.
+    return protein, count_proteoforms(protein_data, limit), merged_rows
+
+def init_worker(protein_items: list) -> None:
+    """
+    Process pool initializer: install the glycopeptide data of all proteins in the
+    worker once, so tasks only need to carry the index of a protein.
+    
+    Args:
+        protein_items (list): (protein, glycopeptide data) pairs for all proteins.
+    """
+    global _worker_protein_items
+    _worker_protein_items = protein_items
+
+def process_protein_task(task: tuple) -> Optional[tuple]:
+    """
+    Unpack an (index, limit) task, look up the protein and its data installed by
+    init_worker, and process it with process_protein.
+    Used with `executor.map`, so errors are logged here and None is returned instead
+    of raising, which would otherwise abort the remaining results of the map.
+    
+    Args:
+        task (tuple): (index into the installed proteins, limit).
+    
+    Returns:
+        tuple or None: The result of process_protein, or None if processing failed.
+    """
+    index, limit = task
+    protein, protein_data = _worker_protein_items[index]
+    try:
+        return process_protein(protein, protein_data, limit)
+    except Exception as e:
+        # Log error with a full traceback for better debugging.
+        logging.error(f"Error processing protein {protein}: {e}\n{traceback.format_exc()}")
+        return None
 
 
 def main(input_file: str, limit: int, protein_col: str, site_col: str, glycan_col: str) -> None:
@@ -99,7 +249,8 @@ def main(input_file: str, limit: int, protein_col: str, site_col: str, glycan_co
     Performs the following steps:
       1. Reads the input CSV file into a pandas DataFrame.
       2. Groups glycopeptides by protein and glycosylation site.
-      3. Generates proteoform combinations for each protein in parallel.
+      3. Generates proteoform combinations for each protein, in parallel for
+         non-trivial workloads.
       4. Writes proteoform counts and merged proteoform details to output files.
       5. Creates a log and a summary file with run details.
     
@@ -112,40 +263,53 @@ def main(input_file: str, limit: int, protein_col: str, site_col: str, glycan_co
     """
     start_time = time.time() # Record start time for performance measurement
 
-    # Read the CSV file
+    # Read the CSV file and collect the unique glycans of each (protein, site) group.
     try:
-        df = pd.read_csv(input_file)
+        glycans_by_site = read_glycans_by_site(input_file, protein_col, site_col, glycan_col)
     except Exception as e:
         logging.error(f"Error reading input file {input_file}: {e}")
         return
 
-    # Group glycopeptides by protein and site, storing unique glycans in a set.
-    # Structure: {protein_id: {glycosylation_site_id: {glycan1, glycan2, ...}}, ...}
-    glycopeptides_raw = defaultdict(lambda: defaultdict(set))
-    for _, row in df.iterrows():
-        protein = row[protein_col]
-        glycosylation_site = row[site_col]
-        glycan = row[glycan_col]
-        glycopeptides_raw[protein][glycosylation_site].add(glycan)
-    
     # Prepare the final dictionary for processing.
-    # Structure: {protein: {site: [[(site, None), (site, glycan1), ...]]}}
-    protein_dict_for_processing = defaultdict(lambda: defaultdict(list))
-    for protein, sites_data in glycopeptides_raw.items():
-        for glycosylation_site, glycans_set in sites_data.items():
-            # For each site, create a list of all possible states: 
-            # not glycosylated (None) or one of the observed glycans.
-            glyco_options = [(glycosylation_site, None)] + \
-                            [(glycosylation_site, glycan) for glycan in glycans_set]
-            
-            # The `itertools.product` function takes multiple iterables as arguments.
-            # To get the Cartesian product of glyco options across different sites,
-            # each site's list of options must be wrapped in another list.
-            protein_dict_for_processing[protein][glycosylation_site].append(glyco_options)
+    # Structure: {protein: {site: [(site, None), (site, glycan1), ...]}}
+    protein_dict_for_processing = {}
+    # Per-protein [total glycosylation sites, total glycans] for the summary CSV,
+    # tallied here so the summary does not need to walk the options again.
+    protein_site_stats = {}
+    # Sites are inserted in sorted order once here, so proteoforms come out of
+    # itertools.product with their sites already ordered for output.
+    # The sort key of each distinct site ID is computed once, since the same site
+    # IDs recur across proteins.
+    site_sort_keys = {}
+    for _, glycosylation_site in glycans_by_site:
+        if glycosylation_site not in site_sort_keys:
+            site_sort_keys[glycosylation_site] = site_sort_key(glycosylation_site)
+    sorted_site_groups = sorted(glycans_by_site.items(), key=lambda item: site_sort_keys[item[0][1]])
+    for (protein, glycosylation_site), glycans in sorted_site_groups:
+        site_stats = protein_site_stats.setdefault(protein, [0, 0])
+        site_stats[0] += 1
+        site_stats[1] += len(glycans)
+        
+        # For each site, create a list of all possible states: 
+        # not glycosylated (None) or one of the observed glycans.
+        # Each site's option list is passed directly as one iterable to
+        # `itertools.product`, so no further wrapping is needed.
+        protein_dict_for_processing.setdefault(protein, {})[glycosylation_site] = \
+            [(glycosylation_site, None)] + [(glycosylation_site, glycan) for glycan in glycans]
+    
+    # Drop the ingestion structures before the process pool starts, so they are not
+    # kept alive (and shared copy-on-write) for the rest of the run.
+    del glycans_by_site, site_sort_keys, sorted_site_groups
     
-    # Create an output directory named after the input file.
-    input_basename = Path(input_file).stem
+    # Create an output directory named after the input file, and compute the
+    # output file paths once up front.
+    input_path = Path(input_file)
+    input_basename = input_path.stem
     base_output_dir = Path("data") / input_basename
+    counts_file_path = base_output_dir / f"00_proteoform_counts_{input_basename}.csv"
+    merged_proteoforms_path = base_output_dir / f"01_merged_proteoforms_{input_basename}.csv"
+    log_file_path = base_output_dir / f"02_input_log_{input_path.name}.txt"
+    summary_csv_path = base_output_dir / f"03_summary_{input_path.name}.csv"
     try:
         base_output_dir.mkdir(parents=True, exist_ok=True)
         logging.info(f"Output directory created: {base_output_dir}")
@@ -153,73 +317,107 @@ def main(input_file: str, limit: int, protein_col: str, site_col: str, glycan_co
         logging.error(f"Error creating output directory {base_output_dir}: {e}")
         return
     
-    # Process each protein in parallel.
+    # Process each protein, in parallel unless the workload is trivial.
     counts = {}
-    all_merged_proteoform_lines = []
     proteins_hitting_limit = []
 
-    logging.info("Starting parallel processing of proteins...")
-    with ProcessPoolExecutor() as executor:
-        future_to_protein = {
-            executor.submit(process_protein, protein, protein_data, limit): protein
-            for protein, protein_data in protein_dict_for_processing.items()
-        }
-        for future in as_completed(future_to_protein):
-            protein = future_to_protein[future]
-            try:
-                # Retrieve the result from the parallel process
-                processed_protein, total_proteoforms, proteoform_strings = future.result()
-                counts[processed_protein] = total_proteoforms
-                all_merged_proteoform_lines.extend(proteoform_strings)
-                logging.info(f"{processed_protein}: Generated {total_proteoforms} proteoforms.")
-
-                # If the number of proteoforms generated equals the limit,
-                # it's likely that more combinations were possible.
-                if total_proteoforms == limit and limit > 0:
-                    proteins_hitting_limit.append(processed_protein)
-
-            except Exception as e:
-                # Log error with a full traceback for better debugging.
-                logging.error(f"Error processing protein {protein}: {e}\n{traceback.format_exc()}")
-    
-    logging.info("Finished parallel processing.")
+    # Failures are logged as they occur, and the remaining output files are still
+    # written for the proteins that completed.
+    outputs_complete = True
+
+    # Proteins are submitted in sorted order; map yields results in the same
+    # order, which keeps the merged output consistent between runs.
+    # Protein IDs are sorted as text so a missing (NaN) protein ID cannot break the sort.
+    # The protein data itself is handed to each worker once by init_worker (inherited
+    # directly where processes are forked), so tasks only carry the protein's index.
+    # The index also avoids looking up a NaN protein ID after it has been pickled,
+    # as NaN never compares equal to a copy of itself.
+    protein_items = sorted(protein_dict_for_processing.items(), key=lambda item: str(item[0]))
+    tasks = [(index, limit) for index in range(len(protein_items))]
+
+    # Starting a process pool costs far more than enumerating a small input, so
+    # trivial workloads are processed serially in this process instead.
+    total_work = sum(count_proteoforms(protein_data, limit)
+                     for protein_data in protein_dict_for_processing.values())
+    executor = None
+    if total_work >= PARALLEL_MIN_PROTEOFORMS and len(tasks) >= PARALLEL_MIN_PROTEINS:
+        logging.info("Starting parallel processing of proteins...")
+        # Only count the CPUs this process may run on, so containers and pinned runs
+        # are not oversubscribed.
+        if hasattr(os, "sched_getaffinity"):
+            max_workers = len(os.sched_getaffinity(0))
+        else:
+            max_workers = os.cpu_count() or 1
+        # ProcessPoolExecutor raises a ValueError above this on Windows.
+        if sys.platform == "win32":
+            max_workers = min(max_workers, WINDOWS_MAX_WORKERS)
+        # Dispatch proteins in chunks so the pickling/IPC overhead is paid per chunk
+        # rather than per protein, with about four chunks per worker to keep the
+        # load balanced when protein sizes vary.
+        chunksize = max(1, len(tasks) // (max_workers * 4))
+        try:
+            executor = ProcessPoolExecutor(max_workers=max_workers, initializer=init_worker,
+                                           initargs=(protein_items,))
+            results = executor.map(process_protein_task, tasks, chunksize=chunksize)
+        except Exception as e:
+            logging.error(f"Error starting the process pool, processing proteins serially instead: {e}")
+            if executor is not None:
+                executor.shutdown()
+                executor = None
+    if executor is None:
+        logging.info("Starting serial processing of proteins...")
+        init_worker(protein_items)
+        executor = contextlib.nullcontext()
+        results = map(process_protein_task, tasks)
+
+    # The merged proteoforms CSV is opened once the executor exists, and each
+    # protein's rows are written as soon as they arrive, instead of being
+    # accumulated and sorted at the end.
+    # The file is opened in binary mode because workers return pre-encoded rows.
+    # Errors raised by the workers themselves are logged per protein by
+    # process_protein_task; an OSError here comes from the merged file, anything
+    # else from the pool (e.g. BrokenProcessPool).
+    with executor:
+        try:
+            with merged_proteoforms_path.open("wb", buffering=WRITE_BUFFER_SIZE) as merged_file:
+                merged_file.write(b"protein,proteoform_id,glycosylation_sites\n")
+                # Results are paired with the proteins they were submitted for, so the
+                # protein IDs used from here on are the original objects.
+                for (processed_protein, protein_data), result in zip(protein_items, results):
+                    if result is None:
+                        outputs_complete = False
+                        continue
+                    _, total_proteoforms, merged_rows = result
+                    counts[processed_protein] = total_proteoforms
+                    merged_file.write(merged_rows)
+                    logging.info(f"{processed_protein}: Generated {total_proteoforms} proteoforms.")
+
+                    # The limit was hit if more combinations were possible than were generated,
+                    # which is known from the per-site option counts without enumerating them.
+                    if count_proteoforms(protein_data, limit + 1) > limit:
+                        proteins_hitting_limit.append(processed_protein)
+        except OSError as e:
+            outputs_complete = False
+            logging.error(f"Error writing merged proteoforms file {merged_proteoforms_path}: {e}")
+        except Exception as e:
+            outputs_complete = False
+            logging.error(f"Error processing proteins: {e}\n{traceback.format_exc()}")
+        else:
+            logging.info("Finished processing proteins.")
+            logging.info(f"Merged proteoforms saved to: {merged_proteoforms_path}")
 
     # Write proteoform counts to a CSV file.
-    counts_file_path = base_output_dir / f"00_proteoform_counts_{input_basename}.csv"
     try:
-        with counts_file_path.open("w") as counts_file:
-            counts_file.write("protein,total_proteoforms\n")
-            for protein, total in sorted(counts.items()):
-                counts_file.write(f"{protein},{total}\n")
+        write_csv_rows(counts_file_path, ["protein", "total_proteoforms"],
+                       sorted(counts.items(), key=lambda item: str(item[0])))
         logging.info(f"Proteoform counts saved to: {counts_file_path}")
     except Exception as e:
+        outputs_complete = False
         logging.error(f"Error writing counts file: {e}")
     
-    # Merge all proteoform data into a single CSV file.
-    merged_proteoforms_path = base_output_dir / f"01_merged_proteoforms_{input_basename}.csv"
-    try:
-        with merged_proteoforms_path.open("w") as merged_file:
-            merged_file.write("protein,proteoform_id,glycosylation_sites\n")
-            # Sort lines for consistent output regardless of processing order
-            for line in sorted(all_merged_proteoform_lines):
-                parts = line.split(',', 1)
-                if len(parts) == 2:
-                    proteoform_id = parts[0].strip()
-                    glycosylation_sites = parts[1].strip()
-                    protein_id = proteoform_id.rsplit('_PF_', 1)[0] 
-                    merged_file.write(f"{protein_id},{proteoform_id},{glycosylation_sites}\n")
-                else:
-                    logging.warning(f"Skipping malformed proteoform line: {line}")
-        logging.info(f"Merged proteoforms saved to: {merged_proteoforms_path}")
-    except Exception as e:
-        logging.error(f"Error writing merged proteoforms file: {e}")
-    
     # Create a detailed log file and a summary CSV.
-    log_file_path = base_output_dir / f"02_input_log_{Path(input_file).name}.txt"
-    summary_csv_path = base_output_dir / f"03_summary_{Path(input_file).name}.csv"
-    
     try:
-        with log_file_path.open("w") as log_file:
+        with log_file_path.open("w", buffering=WRITE_BUFFER_SIZE, newline="") as log_file:
             log_file.write("Glycopeptide Proteoform Generator\n")
             log_file.write(f"Run Date and Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
             log_file.write("\nInput Parameters:\n")
@@ -237,7 +435,7 @@ def main(input_file: str, limit: int, protein_col: str, site_col: str, glycan_co
 
             if proteins_hitting_limit:
                 log_file.write(f"Proteins that hit the proteoform limit ({limit}): {len(proteins_hitting_limit)}/{total_proteins}\n")
-                log_file.write(f"  IDs: {', '.join(sorted(proteins_hitting_limit))}\n")
+                log_file.write(f"  IDs: {', '.join(sorted(map(str, proteins_hitting_limit)))}\n")
             else:
                 log_file.write("No proteins hit the specified proteoform limit.\n")
 
@@ -245,26 +443,27 @@ def main(input_file: str, limit: int, protein_col: str, site_col: str, glycan_co
             runtime_seconds = end_time - start_time
             log_file.write(f"Total script runtime: {runtime_seconds:.2f} seconds\n")
 
-        # Prepare data for summary CSV
-        summary_data = []
-        for protein, protein_data in sorted(protein_dict_for_processing.items()):
-            total_sites = len(protein_data)
-            # Sum total unique glycans observed for the protein
-            total_glycans_for_protein = sum(len(site_glycans[0]) - 1 for site_glycans in protein_data.values()) # -1 for 'None'
-            generated_proteoforms_for_protein = counts.get(protein, 0) 
-            summary_data.append((protein, total_sites, total_glycans_for_protein, generated_proteoforms_for_protein))
+        # Prepare data for summary CSV, sorting by the protein ID as text so a missing
+        # (NaN) protein ID cannot break the sort.
+        summary_data = [(protein, total_sites, total_glycans_for_protein, counts.get(protein, 0))
+                        for protein, (total_sites, total_glycans_for_protein)
+                        in sorted(protein_site_stats.items(), key=lambda item: str(item[0]))]
         
-        summary_df = pd.DataFrame(summary_data, 
-                                  columns=["Protein", "TotalGlycosylationSites", "TotalGlycans", "TotalProteoformsGenerated"])
-        summary_df.to_csv(summary_csv_path, index=False)
+        write_csv_rows(summary_csv_path,
+                       ["Protein", "TotalGlycosylationSites", "TotalGlycans", "TotalProteoformsGenerated"],
+                       summary_data)
         
         logging.info(f"Log file saved to: {log_file_path}")
         logging.info(f"Summary CSV saved to: {summary_csv_path}")
 
     except Exception as e:
+        outputs_complete = False
         logging.error(f"Error writing log/summary files: {e}")
     
-    logging.info("All output files have been generated successfully.")
+    if outputs_complete:
+        logging.info("All output files have been generated successfully.")
+    else:
+        logging.warning("Some output files are incomplete; see the errors above.")
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(